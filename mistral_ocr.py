@@ -1,21 +1,342 @@
 import os
+import re
 import sys
-import glob
+import argparse
 import json
+import mmap
 import base64
-import urllib.request
+import shutil
+import asyncio
+import tempfile
+import functools
+import hashlib
+import httpx
+import orjson
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from mistralai import Mistral
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 
-# Replace this with your actual API key
-MISTRAL_API_KEY = "your_api_key_here"
+# API key comes from the environment; main() fails fast when it is unset
+MISTRAL_API_KEY = os.environ.get("MISTRAL_API_KEY", "")
 
-def process_ocr_response(response_dict, base_name):
+# OCR model used for all requests (part of the cache key)
+OCR_MODEL = "mistral-ocr-latest"
+
+# On-disk cache of raw OCR responses, keyed by file content and request
+# parameters, so re-running in a directory doesn't re-pay the API for
+# byte-identical files
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mistral_ocr")
+
+# Shared HTTP session for downloading remote images. The adapter's pool
+# reuses TCP+TLS connections across images served from the same host.
+_SESSION = requests.Session()
+_http_adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32)
+_SESSION.mount("https://", _http_adapter)
+_SESSION.mount("http://", _http_adapter)
+
+# Single shared API client so every upload, signed-URL, and OCR call reuses
+# the same keep-alive connection pool instead of paying a fresh TLS
+# handshake per file
+_CLIENT = Mistral(
+    api_key=MISTRAL_API_KEY,
+    async_client=httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+    ),
+)
+
+# Maximum number of files admitted at once. Deliberately the sum of the
+# per-stage caps below: even when the OCR stage is saturated, later files
+# can still be admitted and run their upload/sign stages.
+CONCURRENCY_LIMIT = 16
+
+# Per-stage concurrency caps. Uploads and signed-URL requests are short
+# round-trips while OCR can run for seconds, so the early stages are capped
+# lower and the slowest stage becomes the only bottleneck.
+_upload_semaphore = asyncio.Semaphore(4)
+_sign_semaphore = asyncio.Semaphore(4)
+_ocr_semaphore = asyncio.Semaphore(8)
+
+# HTTP statuses worth retrying: rate limits and transient server errors
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+def _is_retryable(exc):
+    """
+    Decide whether a failed API call should be retried.
+
+    Args:
+        exc (BaseException): The exception raised by the call
+
+    Returns:
+        bool: True for timeouts, transport errors, and retryable HTTP statuses
+    """
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError)):
+        return True
+    return getattr(exc, 'status_code', None) in _RETRYABLE_STATUS
+
+def _retry_wait(retry_state):
+    """
+    Compute how long to sleep before the next retry attempt.
+
+    Honors the server's Retry-After header when one is present (the usual
+    case for 429s), falling back to exponential backoff with jitter.
+
+    Args:
+        retry_state (tenacity.RetryCallState): State of the current retry
+
+    Returns:
+        float: Seconds to wait
+    """
+    exc = retry_state.outcome.exception()
+    response = getattr(exc, 'raw_response', None)
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return wait_exponential_jitter(initial=1, max=30)(retry_state)
+
+# Shared retry policy for the three API calls, so one transient 429 or 5xx
+# no longer fails the whole file
+_api_retry = retry(
+    stop=stop_after_attempt(5),
+    wait=_retry_wait,
+    retry=retry_if_exception(_is_retryable),
+    reraise=True,
+)
+
+@_api_retry
+async def _upload_file(file_name, content):
+    """
+    Upload a file for OCR, retrying transient failures.
+
+    Args:
+        file_name (str): Name to store the file under
+        content: File content (bytes or an open binary file object)
+
+    Returns:
+        The uploaded file object from the API
+    """
+    # Rewind in case a previous attempt consumed part of the content
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return await _CLIENT.files.upload_async(
+        file={
+            "file_name": file_name,
+            "content": content,
+        },
+        purpose="ocr"
+    )
+
+@_api_retry
+async def _get_signed_url(file_id):
+    """
+    Fetch a signed URL for an uploaded file, retrying transient failures.
+
+    Args:
+        file_id (str): ID of the uploaded file
+
+    Returns:
+        The signed URL object from the API
+    """
+    return await _CLIENT.files.get_signed_url_async(file_id=file_id)
+
+@_api_retry
+async def _ocr_process(document, include_image_base64):
+    """
+    Run OCR on an uploaded document, retrying transient failures.
+
+    Args:
+        document (dict): Document reference for the OCR API
+        include_image_base64 (bool): Whether to embed base64 image data
+
+    Returns:
+        The OCR response object from the API
+    """
+    return await _CLIENT.ocr.process_async(
+        model=OCR_MODEL,
+        document=document,
+        include_image_base64=include_image_base64
+    )
+
+def _fingerprint(path, model, include_image_base64):
+    """
+    Compute a cache key from a file's content and the OCR request parameters.
+
+    Args:
+        path (str): Path to the input file
+        model (str): OCR model name
+        include_image_base64 (bool): Whether base64 images were requested
+
+    Returns:
+        str: Hex digest identifying this file/parameter combination
+    """
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        try:
+            # Memory-map the file so hashing doesn't copy it into userspace
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                hasher.update(mapped)
+        except ValueError:
+            # Empty files cannot be memory-mapped
+            pass
+    # Include the request parameters so changing them invalidates old entries
+    hasher.update(f"|{model}|{include_image_base64}".encode("utf-8"))
+    return hasher.hexdigest()
+
+def _cache_lookup(fingerprint):
+    """
+    Load a cached OCR response for the given fingerprint, if one exists.
+
+    Args:
+        fingerprint (str): Cache key from _fingerprint
+
+    Returns:
+        dict or None: The cached response, or None on a cache miss
+    """
+    cache_path = os.path.join(CACHE_DIR, f"{fingerprint}.json")
+    try:
+        with open(cache_path, "r", encoding="utf-8") as cache_file:
+            return json.load(cache_file)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _cache_store(fingerprint, response_dict):
+    """
+    Store an OCR response in the cache. Failures are non-fatal.
+
+    Args:
+        fingerprint (str): Cache key from _fingerprint
+        response_dict (dict): The OCR response to cache
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        cache_path = os.path.join(CACHE_DIR, f"{fingerprint}.json")
+        # Write to a temporary file and rename it into place so concurrent
+        # tasks storing the same fingerprint cannot interleave their writes
+        fd, temp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+                json.dump(response_dict, cache_file)
+            os.replace(temp_path, cache_path)
+        finally:
+            # Only present if the dump or rename above failed
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+    except (OSError, TypeError):
+        # The cache is an optimization; never let it break processing
+        pass
+
+@functools.lru_cache(maxsize=None)
+def _dump_method(response_type):
+    """
+    Resolve the dict-conversion method for a response class, once per class.
+
+    Args:
+        response_type (type): Class of the OCR response object
+
+    Returns:
+        callable or None: The conversion method, or None if the class has no
+            recognized converter
+    """
+    for name in ('model_dump', 'dict', 'to_dict'):
+        method = getattr(response_type, name, None)
+        if method is not None:
+            return method
+    return None
+
+def _to_dict(response):
+    """
+    Convert an OCR response object to a plain dictionary.
+
+    Modern mistralai responses are Pydantic v2 models, so model_dump() is
+    tried first; the resolved method is cached per class, leaving one
+    lookup and one call per response.
+
+    Args:
+        response: OCR response object from the API
+
+    Returns:
+        dict: The response as a dictionary
+    """
+    method = _dump_method(type(response))
+    if method is not None:
+        return method(response)
+    if hasattr(response, '__dict__'):
+        # Try the object's __dict__
+        return response.__dict__
+    # Try to convert the string representation to JSON
+    try:
+        return json.loads(str(response))
+    except json.JSONDecodeError:
+        # If it's not JSON, use the string representation
+        return {"raw_text": str(response)}
+
+def _save_one_image(task):
+    """
+    Save a single extracted image to disk, dispatching on the data format.
+
+    Args:
+        task (tuple): (image_path, image_data) where image_data is either a
+            base64 payload (with or without data: prefix) or a remote URL
+    """
+    image_path, image_data = task
+    try:
+        if image_data.startswith(('http://', 'https://')):
+            # Remote image URL: stream to disk in 64 KiB chunks
+            with _SESSION.get(image_data, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                with open(image_path, 'wb') as img_file:
+                    shutil.copyfileobj(response.raw, img_file, length=65536)
+        else:
+            # Handle base64 data
+            if image_data.startswith('data:image'):
+                # Extract the base64 string after the comma
+                b64_data = image_data.split(',', 1)[1]
+            else:
+                # If it's already just the base64 data without prefix
+                b64_data = image_data
+
+            # Decode and save the image with raw writes, skipping the
+            # buffered-IO layer that tiny images never benefit from.
+            # os.write may write fewer bytes than asked, so loop until
+            # the whole image is on disk.
+            fd = os.open(image_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                remaining = memoryview(base64.b64decode(b64_data))
+                while remaining:
+                    written = os.write(fd, remaining)
+                    remaining = remaining[written:]
+            finally:
+                os.close(fd)
+        print(f"  Saved image to {image_path}")
+    except Exception as e:
+        print(f"  Error saving image: {str(e)}")
+
+def _write_json_sidecar(path, response_dict):
+    """
+    Serialize and write the _full.json sidecar.
+
+    Runs in a worker thread: orjson encoding of a large response and the
+    disk write would otherwise block the event loop.
+
+    Args:
+        path (str): Output path for the sidecar
+        response_dict (dict): The OCR response to serialize
+    """
+    with open(path, "wb") as json_file:
+        json_file.write(orjson.dumps(response_dict, option=orjson.OPT_INDENT_2))
+
+def process_ocr_response(response_dict, base_name, keep_base64=False):
     """
     Process OCR response to extract markdown content and images
     
     Args:
         response_dict (dict): OCR response data
         base_name (str): Base filename for output
+        keep_base64 (bool): Keep raw base64 image data in the response dict
+            instead of replacing it with the saved images' local paths
         
     Returns:
         str: Extracted markdown content
@@ -36,6 +357,7 @@ def process_ocr_response(response_dict, base_name):
     
     # Process each page to extract markdown and handle images
     all_content = []
+    save_tasks = []
     
     for page_idx, page in enumerate(response_dict.get('pages', [])):
         page_markdown = page.get('markdown', '')
@@ -45,64 +367,71 @@ def process_ocr_response(response_dict, base_name):
         if page_images:
             print(f"  Found {len(page_images)} images on page {page_idx + 1}")
             
-            # Create a dictionary to map image IDs to their base64 data
+            # Create a dictionary to map image IDs to their local file paths
             image_data_dict = {}
             
             for img_idx, image in enumerate(page_images):
-                # Get image ID and base64 data
+                # Get image ID and base64 data; older responses carried the
+                # payload in a 'data' field instead of 'image_base64'
                 image_id = image.get('id')
-                image_base64 = image.get('image_base64')
+                image_base64 = image.get('image_base64') or image.get('data')
                 
                 if not image_id or not image_base64:
                     print(f"  Warning: Image {img_idx} is missing id or base64 data, skipping")
                     continue
                 
-                # Save the image to a file
+                # Queue the image for saving after the page loop. image_dir
+                # is a bare directory name, so plain f-string joins avoid a
+                # per-image os.path call in this loop.
                 image_format = image.get('format', 'png')
                 image_filename = f"{base_name}_page{page_idx + 1}_img{img_idx + 1}.{image_format}"
-                image_path = os.path.join(image_dir, image_filename)
+                image_path = f"{image_dir}/{image_filename}"
+                save_tasks.append((image_path, image_base64))
+                
+                # Add an entry to the dictionary mapping image ID to the local file path
+                # This will be used to replace the image references in the markdown
+                image_data_dict[image_id] = f"./{image_path}"
                 
-                try:
-                    # Handle base64 data
-                    if image_base64.startswith('data:image'):
-                        # Extract the base64 string after the comma
-                        b64_data = image_base64.split(',', 1)[1]
-                    else:
-                        # If it's already just the base64 data without prefix
-                        b64_data = image_base64
-                        
-                    # Decode and save the image
-                    with open(image_path, 'wb') as img_file:
-                        img_file.write(base64.b64decode(b64_data))
-                    print(f"  Saved image to {image_path}")
-                    
-                    # Add an entry to the dictionary mapping image ID to the local file path
-                    # This will be used to replace the image references in the markdown
-                    image_data_dict[image_id] = f"./{os.path.basename(image_dir)}/{image_filename}"
-                    
-                except Exception as e:
-                    print(f"  Error saving image: {str(e)}")
+                # Point the JSON sidecar at the saved file instead of
+                # duplicating the base64 payload on disk, covering the
+                # legacy 'data' field as well when it carried the payload
+                if not keep_base64:
+                    image['image_base64'] = image_data_dict[image_id]
+                    if 'data' in image:
+                        image['data'] = image_data_dict[image_id]
             
-            # Replace image references in the markdown
-            for img_id, img_path in image_data_dict.items():
+            # Replace all image references in one linear scan instead of
+            # re-scanning the markdown once per image
+            if image_data_dict:
                 # Format expected by the Mistral OCR API is ![id](id)
-                page_markdown = page_markdown.replace(f"![{img_id}]({img_id})", f"![Image {img_id}]({img_path})")
+                pattern = re.compile(
+                    r"!\[(" + "|".join(map(re.escape, image_data_dict)) + r")\]\(\1\)"
+                )
+                page_markdown = pattern.sub(
+                    lambda m: f"![Image {m[1]}]({image_data_dict[m[1]]})",
+                    page_markdown
+                )
         
         # Add processed page markdown to the content list
         all_content.append(page_markdown)
     
-    # Join all pages with double newlines
-    content = "\n\n".join(all_content)
+    # Save all images in parallel: base64 decode + disk writes and URL
+    # downloads are independent per image, so a thread pool fans them out
+    if save_tasks:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(_save_one_image, save_tasks))
     
-    return content
+    # Join all pages with double newlines
+    return "\n\n".join(all_content)
 
-def process_pdf_with_ocr(pdf_path):
+async def process_pdf_with_ocr(pdf_path, keep_base64=False):
     """
     Process a PDF file with Mistral's OCR API and save the results as a markdown file.
-    
+
     Args:
         pdf_path (str): Path to the PDF file to process
-        
+        keep_base64 (bool): Keep raw base64 image data in the JSON sidecar
+
     Returns:
         bool: True if processing was successful, False otherwise
     """
@@ -110,87 +439,78 @@ def process_pdf_with_ocr(pdf_path):
     file_name = os.path.basename(pdf_path)
     base_name = os.path.splitext(file_name)[0]
     output_path = f"{base_name}.md"
-    
+
     print(f"Processing '{file_name}'...")
-    
+
     try:
-        # Initialize the Mistral client
-        client = Mistral(api_key=MISTRAL_API_KEY)
-        
-        # Step 1: Upload the PDF file
-        print(f"  Uploading file...")
-        uploaded_pdf = client.files.upload(
-            file={
-                "file_name": file_name,
-                "content": open(pdf_path, "rb"),
-            },
-            purpose="ocr"
-        )
-        print(f"  File uploaded successfully. File ID: {uploaded_pdf.id}")
-        
-        # Step 2: Get a signed URL for the uploaded file
-        print(f"  Getting signed URL...")
-        signed_url = client.files.get_signed_url(file_id=uploaded_pdf.id)
-        print(f"  Signed URL obtained.")
-        
-        # Step 3: Process the file with OCR
-        print(f"  Processing with OCR (this may take a while)...")
-        ocr_response = client.ocr.process(
-            model="mistral-ocr-latest",
-            document={
-                "type": "document_url",
-                "document_url": signed_url.url,
-            },
-            include_image_base64=True  # Enable base64 image extraction
-        )
-        
-        # Convert the OCR response to a dictionary if it isn't already
-        if hasattr(ocr_response, 'model_dump'):
-            # For Pydantic models
-            response_dict = ocr_response.model_dump()
-        elif hasattr(ocr_response, 'dict'):
-            # For older Pydantic models
-            response_dict = ocr_response.dict()
-        elif hasattr(ocr_response, 'to_dict'):
-            # Some libraries use to_dict
-            response_dict = ocr_response.to_dict()
-        elif hasattr(ocr_response, '__dict__'):
-            # Try the object's __dict__
-            response_dict = ocr_response.__dict__
+        # Check the response cache before paying for the three API calls
+        fingerprint = await asyncio.to_thread(_fingerprint, pdf_path, OCR_MODEL, True)
+        response_dict = _cache_lookup(fingerprint)
+
+        if response_dict is not None:
+            print(f"  Using cached OCR response, skipping API calls.")
         else:
-            # Try to convert the string representation to JSON
-            try:
-                response_dict = json.loads(str(ocr_response))
-            except json.JSONDecodeError:
-                # If it's not JSON, use the string representation
-                response_dict = {"raw_text": str(ocr_response)}
-        
-        # Process the OCR response to extract content and images
-        content = process_ocr_response(response_dict, base_name)
+            # Step 1: Upload the PDF file. The with block closes the handle
+            # the bare open() used to leak; the SDK only accepts bytes or a
+            # real file object, so the handle is passed straight through and
+            # the SDK streams from it during multipart encoding.
+            print(f"  Uploading file...")
+            with open(pdf_path, "rb") as pdf_file:
+                async with _upload_semaphore:
+                    uploaded_pdf = await _upload_file(file_name, pdf_file)
+            print(f"  File uploaded successfully. File ID: {uploaded_pdf.id}")
+
+            # Step 2: Get a signed URL for the uploaded file
+            print(f"  Getting signed URL...")
+            async with _sign_semaphore:
+                signed_url = await _get_signed_url(uploaded_pdf.id)
+            print(f"  Signed URL obtained.")
+
+            # Step 3: Process the file with OCR
+            print(f"  Processing with OCR (this may take a while)...")
+            # First pass without embedded images: text-only documents (the
+            # common case) get a much smaller response and skip base64
+            # decode and storage entirely
+            async with _ocr_semaphore:
+                ocr_response = await _ocr_process({
+                    "type": "document_url",
+                    "document_url": signed_url.url,
+                }, include_image_base64=False)
+
+            # Convert the OCR response to a dictionary if it isn't already
+            response_dict = _to_dict(ocr_response)
+
+            # Upgrade only when pages actually reference images
+            if any(page.get('images') for page in response_dict.get('pages', [])):
+                print(f"  Images detected, re-requesting with embedded image data...")
+                async with _ocr_semaphore:
+                    ocr_response = await _ocr_process({
+                        "type": "document_url",
+                        "document_url": signed_url.url,
+                    }, include_image_base64=True)
+                response_dict = _to_dict(ocr_response)
+
+            # Cache the raw response so re-runs on identical files are free
+            _cache_store(fingerprint, response_dict)
+
+        # Process the OCR response to extract content and images. This
+        # blocks on image decoding, downloads, and disk writes, so it runs
+        # in a worker thread to keep the event loop free for other files.
+        content = await asyncio.to_thread(
+            process_ocr_response, response_dict, base_name, keep_base64
+        )
         
         # Save the extracted markdown content to a file
         print(f"  Saving extracted markdown content to {output_path}")
         with open(output_path, "w", encoding="utf-8") as md_file:
             md_file.write(content.strip())
             
-        # Optionally save the full JSON response for reference
-        # But first strip the base64 image data to reduce file size
+        # Save the full JSON response for reference. Unless --keep-base64
+        # was given, the base64 blobs were already replaced with the saved
+        # images' local paths, so no copy or stripping pass is needed.
         json_output_path = f"{base_name}_full.json"
-        
-        # Create a copy of the response dictionary to modify
-        clean_response = json.loads(json.dumps(response_dict))
-        
-        # Strip out the base64 image data from the copy
-        for page in clean_response.get('pages', []):
-            for image in page.get('images', []):
-                if 'image_base64' in image:
-                    # Replace the base64 data with a placeholder
-                    image['image_base64'] = "[BASE64_DATA_REMOVED]"
-        
-        # Save the modified JSON
-        with open(json_output_path, "w", encoding="utf-8") as json_file:
-            json.dump(clean_response, json_file, indent=2)
-        print(f"  Full OCR response saved to {json_output_path} (without base64 image data)")
+        await asyncio.to_thread(_write_json_sidecar, json_output_path, response_dict)
+        print(f"  Full OCR response saved to {json_output_path}")
         
         return True
         
@@ -198,13 +518,14 @@ def process_pdf_with_ocr(pdf_path):
         print(f"  Error: {str(e)}")
         return False
 
-def process_image_with_ocr(image_path):
+async def process_image_with_ocr(image_path, keep_base64=False):
     """
     Process an image file with Mistral's OCR API and save the results as a markdown file.
-    
+
     Args:
         image_path (str): Path to the image file to process
-        
+        keep_base64 (bool): Keep raw base64 image data in the JSON sidecar
+
     Returns:
         bool: True if processing was successful, False otherwise
     """
@@ -212,81 +533,77 @@ def process_image_with_ocr(image_path):
     file_name = os.path.basename(image_path)
     base_name = os.path.splitext(file_name)[0]
     output_path = f"{base_name}.md"
-    
+
     print(f"Processing image '{file_name}'...")
-    
+
     try:
-        # Initialize the Mistral client
-        client = Mistral(api_key=MISTRAL_API_KEY)
-        
-        # Step 1: Upload the image file
-        print(f"  Uploading image...")
-        uploaded_image = client.files.upload(
-            file={
-                "file_name": file_name,
-                "content": open(image_path, "rb"),
-            },
-            purpose="ocr"
-        )
-        print(f"  Image uploaded successfully. File ID: {uploaded_image.id}")
-        
-        # Step 2: Get a signed URL for the uploaded image
-        print(f"  Getting signed URL...")
-        signed_url = client.files.get_signed_url(file_id=uploaded_image.id)
-        print(f"  Signed URL obtained.")
-        
-        # Step 3: Process the image with OCR
-        print(f"  Processing with OCR (this may take a while)...")
-        ocr_response = client.ocr.process(
-            model="mistral-ocr-latest",
-            document={
-                "type": "image_url",
-                "image_url": signed_url.url,
-            },
-            include_image_base64=True  # Enable base64 image extraction
-        )
-        
-        # Convert the OCR response to a dictionary
-        if hasattr(ocr_response, 'model_dump'):
-            response_dict = ocr_response.model_dump()
-        elif hasattr(ocr_response, 'dict'):
-            response_dict = ocr_response.dict()
-        elif hasattr(ocr_response, 'to_dict'):
-            response_dict = ocr_response.to_dict()
-        elif hasattr(ocr_response, '__dict__'):
-            response_dict = ocr_response.__dict__
+        # Check the response cache before paying for the three API calls
+        fingerprint = await asyncio.to_thread(_fingerprint, image_path, OCR_MODEL, True)
+        response_dict = _cache_lookup(fingerprint)
+
+        if response_dict is not None:
+            print(f"  Using cached OCR response, skipping API calls.")
         else:
-            try:
-                response_dict = json.loads(str(ocr_response))
-            except json.JSONDecodeError:
-                response_dict = {"raw_text": str(ocr_response)}
-        
-        # Process the OCR response to extract content and images
-        content = process_ocr_response(response_dict, base_name)
+            # Step 1: Upload the image file. The with block closes the
+            # handle the bare open() used to leak; the SDK streams from the
+            # file object during multipart encoding.
+            print(f"  Uploading image...")
+            with open(image_path, "rb") as image_file:
+                async with _upload_semaphore:
+                    uploaded_image = await _upload_file(file_name, image_file)
+            print(f"  Image uploaded successfully. File ID: {uploaded_image.id}")
+
+            # Step 2: Get a signed URL for the uploaded image
+            print(f"  Getting signed URL...")
+            async with _sign_semaphore:
+                signed_url = await _get_signed_url(uploaded_image.id)
+            print(f"  Signed URL obtained.")
+
+            # Step 3: Process the image with OCR
+            print(f"  Processing with OCR (this may take a while)...")
+            # First pass without embedded images: text-only documents (the
+            # common case) get a much smaller response and skip base64
+            # decode and storage entirely
+            async with _ocr_semaphore:
+                ocr_response = await _ocr_process({
+                    "type": "image_url",
+                    "image_url": signed_url.url,
+                }, include_image_base64=False)
+
+            # Convert the OCR response to a dictionary if it isn't already
+            response_dict = _to_dict(ocr_response)
+
+            # Upgrade only when pages actually reference images
+            if any(page.get('images') for page in response_dict.get('pages', [])):
+                print(f"  Images detected, re-requesting with embedded image data...")
+                async with _ocr_semaphore:
+                    ocr_response = await _ocr_process({
+                        "type": "image_url",
+                        "image_url": signed_url.url,
+                    }, include_image_base64=True)
+                response_dict = _to_dict(ocr_response)
+
+            # Cache the raw response so re-runs on identical files are free
+            _cache_store(fingerprint, response_dict)
+
+        # Process the OCR response to extract content and images. This
+        # blocks on image decoding, downloads, and disk writes, so it runs
+        # in a worker thread to keep the event loop free for other files.
+        content = await asyncio.to_thread(
+            process_ocr_response, response_dict, base_name, keep_base64
+        )
         
         # Save the extracted markdown content to a file
         print(f"  Saving extracted markdown content to {output_path}")
         with open(output_path, "w", encoding="utf-8") as md_file:
             md_file.write(content.strip())
             
-        # Optionally save the full JSON response for reference
-        # But first strip the base64 image data to reduce file size
+        # Save the full JSON response for reference. Unless --keep-base64
+        # was given, the base64 blobs were already replaced with the saved
+        # images' local paths, so no copy or stripping pass is needed.
         json_output_path = f"{base_name}_full.json"
-        
-        # Create a copy of the response dictionary to modify
-        clean_response = json.loads(json.dumps(response_dict))
-        
-        # Strip out the base64 image data from the copy
-        for page in clean_response.get('pages', []):
-            for image in page.get('images', []):
-                if 'image_base64' in image:
-                    # Replace the base64 data with a placeholder
-                    image['image_base64'] = "[BASE64_DATA_REMOVED]"
-        
-        # Save the modified JSON
-        with open(json_output_path, "w", encoding="utf-8") as json_file:
-            json.dump(clean_response, json_file, indent=2)
-        print(f"  Full OCR response saved to {json_output_path} (without base64 image data)")
+        await asyncio.to_thread(_write_json_sidecar, json_output_path, response_dict)
+        print(f"  Full OCR response saved to {json_output_path}")
         
         return True
         
@@ -301,63 +618,111 @@ def find_files_to_process():
     Returns:
         list: List of paths to files to process
     """
-    # Define supported image file extensions
-    image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp']
-    
-    # Find all PDFs
-    pdf_files = glob.glob("*.pdf")
+    # Supported extensions; matching is case-insensitive by construction
+    extensions = {'.pdf', '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp'}
     
-    # Find all supported image files
-    image_files = []
-    for ext in image_extensions:
-        image_files.extend(glob.glob(f"*{ext}"))
-        image_files.extend(glob.glob(f"*{ext.upper()}"))  # Also match uppercase extensions
-    
-    # Combine and return all files
-    return pdf_files + image_files
+    # One directory scan instead of a glob per extension and case variant
+    with os.scandir('.') as entries:
+        return [
+            entry.name
+            for entry in entries
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions
+        ]
 
-def process_file(file_path):
+async def process_file(file_path, keep_base64=False):
     """
     Process a file with the appropriate OCR method based on file type
-    
+
     Args:
         file_path (str): Path to the file to process
-        
+        keep_base64 (bool): Keep raw base64 image data in the JSON sidecar
+
     Returns:
         bool: True if processing was successful, False otherwise
     """
     # Check file extension to determine processing method
     file_extension = os.path.splitext(file_path)[1].lower()
-    
+
     if file_extension == '.pdf':
-        return process_pdf_with_ocr(file_path)
+        return await process_pdf_with_ocr(file_path, keep_base64=keep_base64)
     elif file_extension in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif', '.webp']:
-        return process_image_with_ocr(file_path)
+        return await process_image_with_ocr(file_path, keep_base64=keep_base64)
     else:
         print(f"Unsupported file type: {file_extension}")
         return False
 
-if __name__ == "__main__":
-    # Find all eligible files in the current directory
+async def _bounded_gather(tasks, limit=CONCURRENCY_LIMIT):
+    """
+    Run coroutines concurrently, allowing at most `limit` in flight at once.
+
+    Args:
+        tasks (list): Coroutines to run
+        limit (int): Maximum number of coroutines running concurrently
+
+    Returns:
+        list: Results of the coroutines, in order
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _run(task):
+        async with semaphore:
+            return await task
+
+    return await asyncio.gather(*(_run(task) for task in tasks))
+
+def _parse_args():
+    """
+    Parse command-line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Process PDFs and images in the current directory with Mistral OCR"
+    )
+    parser.add_argument(
+        "--keep-base64",
+        action="store_true",
+        help="Keep raw base64 image data in the _full.json sidecar instead of "
+             "replacing it with the extracted images' local paths"
+    )
+    return parser.parse_args()
+
+async def main():
+    """
+    Find all eligible files in the current directory and process them concurrently.
+
+    Returns:
+        int: Exit code (0 on success, 1 if no files were found)
+    """
+    args = _parse_args()
+
+    if not MISTRAL_API_KEY:
+        print("MISTRAL_API_KEY environment variable is not set.")
+        return 1
+
     files = find_files_to_process()
-    
+
     if not files:
         print("No PDF or image files found in the current directory.")
-        sys.exit(1)
-    
+        return 1
+
     print(f"Found {len(files)} file(s) to process.")
-    
-    # Process each file
-    successful = 0
-    failed = 0
-    
-    for file_path in files:
-        if process_file(file_path):
-            successful += 1
-        else:
-            failed += 1
-    
+
+    # Process all files concurrently, bounded by the global concurrency limit
+    results = await _bounded_gather(
+        [process_file(file_path, keep_base64=args.keep_base64) for file_path in files]
+    )
+
+    successful = sum(1 for result in results if result)
+    failed = len(results) - successful
+
     # Print summary
     print("\nProcessing complete!")
     print(f"Successfully processed: {successful}")
     print(f"Failed to process: {failed}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))